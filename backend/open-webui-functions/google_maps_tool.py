@@ -1,22 +1,286 @@
 """
 title: Google Maps Integration
 author: Moh Rizal Alfarizi
-version: 1.0.0
+version: 1.1.0
 description: Search places and get directions using Google Maps API
+requirements: httpx, orjson, cachetools
 """
 
+import asyncio
+import atexit
+import hashlib
+import inspect
+import logging
+import os
+import random
+import socket
+import time
+from functools import lru_cache
 from typing import Any, Callable, Optional
 
-import requests
+import httpx
+import orjson
+from cachetools import TTLCache
 from pydantic import BaseModel, Field
 
+# Opt-in HTTP/2: multiplexes parallel tool calls over one connection with
+# compressed headers. The Node backend itself speaks HTTP/1.1, so only enable
+# this when it sits behind an HTTP/2-capable reverse proxy (needs the h2
+# package installed).
+_HTTP2 = os.getenv("MAPS_TOOL_HTTP2", "").lower() in ("1", "true", "yes")
+
+# Docker service name when running in containers, localhost for local dev
+_BACKEND_HOST = "backend"
+_BACKEND_PORT = 8432
+_DNS_REFRESH_SECONDS = 300
+
+_resolved_ip: Optional[str] = None
+_resolved_at = 0.0
+_refreshing = False
+
+
+def _refresh_backend_ip() -> None:
+    """Resolve the backend host; runs in a worker thread after import."""
+    global _resolved_ip, _resolved_at, _refreshing
+    try:
+        _resolved_ip = socket.gethostbyname(_BACKEND_HOST)
+    except OSError:
+        _resolved_ip = None  # fall back to the hostname
+    _resolved_at = time.monotonic()
+    _refreshing = False
+
+
+def _backend_base_url() -> str:
+    """
+    Backend base URL, pinned to a cached IP when the host resolves.
+
+    Resolving once and refreshing every five minutes keeps DNS latency (and
+    the occasional pathological resolver timeout) off the cold-connection
+    path while still picking up container restarts. Refreshes run in a
+    worker thread - gethostbyname blocks, and this is called from async
+    methods - so the last-known IP keeps being served until the new one
+    lands. If resolution fails the hostname is used as-is; the client
+    always sends Host: backend so the pinned IP is transparent to the
+    server.
+    """
+    global _refreshing
+    expired = not _resolved_at or time.monotonic() - _resolved_at >= _DNS_REFRESH_SECONDS
+    if expired and not _refreshing:
+        _refreshing = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            _refresh_backend_ip()  # no loop yet (import time): resolve inline
+        else:
+            loop.run_in_executor(None, _refresh_backend_ip)
+    host = _resolved_ip or _BACKEND_HOST
+    return f"http://{host}:{_BACKEND_PORT}/api/maps"
+
+
+# Process-wide async client so connection pooling survives across Tools
+# instances and parallel tool calls share the event loop instead of each
+# blocking a worker thread for the full request duration
+_ACLIENT = httpx.AsyncClient(
+    http2=_HTTP2,
+    timeout=10.0,
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    headers={"Host": _BACKEND_HOST},
+)
+
+_backend_base_url()  # warm the DNS cache at import
+
+
+def _close_client() -> None:
+    """Close the shared client on interpreter shutdown."""
+    try:
+        asyncio.run(_ACLIENT.aclose())
+    except Exception:
+        pass  # Event loop may already be gone at shutdown
+
+
+atexit.register(_close_client)
+
+# Place details are effectively static for hours; cache the formatted reply
+# per placeId so repeat lookups skip the backend POST entirely
+_DETAILS_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+
+
+def cache_clear() -> None:
+    """Drop all cached place details."""
+    _DETAILS_CACHE.clear()
+
+
+# Per-place Markdown block, compiled once instead of re-concatenated per call;
+# rating_line is precomputed ("" when the place has no rating)
+_PLACE_TMPL = (
+    "{i}. **{name}**\n"
+    "   📍 {address}\n"
+    "{rating_line}"
+    "   🔗 [View on Google Maps]({googleMapsUrl})\n"
+    "   🗺️ [Embedded Map]({embedMapUrl})\n"
+    "   📌 Place ID: `{placeId}`\n\n"
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Transient statuses worth retrying; anything else fails fast
+_RETRY_STATUSES = {429, 502, 503, 504}
+_MAX_RETRIES = 3
+
+
+async def _post_with_retry(url: str, content: bytes, headers: dict) -> httpx.Response:
+    """
+    POST with exponential backoff and jitter on 429/5xx or transport errors.
+
+    A Retry-After header (e.g. from the backend rate limiter) takes
+    precedence over the computed delay. Self-healing here is much cheaper
+    than surfacing the failure and having the LLM replay the tool call.
+    """
+    delay = 0.5
+    for attempt in range(1, _MAX_RETRIES + 1):
+        last = attempt == _MAX_RETRIES
+        # Jitter applies only to the computed backoff; a server-supplied
+        # Retry-After below replaces it verbatim
+        sleep_for = delay * (1 + random.random())
+        try:
+            response = await _ACLIENT.post(url, content=content, headers=headers)
+        except httpx.TransportError as exc:
+            if last:
+                raise
+            _LOGGER.warning("Retrying %s after transport error: %s", url, exc)
+        else:
+            if last or response.status_code not in _RETRY_STATUSES:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            # Only delta-seconds values are honored; HTTP-date values fall
+            # through to the computed backoff rather than pulling in a parser
+            if retry_after and retry_after.isdigit():
+                sleep_for = float(retry_after)
+            _LOGGER.warning("Retrying %s after HTTP %d", url, response.status_code)
+        await asyncio.sleep(sleep_for)
+        delay *= 2
+    raise AssertionError("unreachable")  # loop always returns or raises
+
+
+# Payload builders memoized per unique input, so duplicate calls reuse the
+# serialized bytes instead of re-encoding the same dict
+@lru_cache(maxsize=256)
+def _serialize_search(query: str, location: Optional[str], radius: int) -> bytes:
+    return orjson.dumps(
+        {"query": query, "location": location, "radius": radius, "limit": 5},
+        option=orjson.OPT_SORT_KEYS,
+    )
+
+
+@lru_cache(maxsize=256)
+def _serialize_directions(origin: str, destination: str, mode: str) -> bytes:
+    return orjson.dumps(
+        {"origin": origin, "destination": destination, "mode": mode, "maxSteps": 10},
+        option=orjson.OPT_SORT_KEYS,
+    )
+
+
+@lru_cache(maxsize=1024)
+def _serialize_details(place_id: str) -> bytes:
+    return orjson.dumps({"placeId": place_id}, option=orjson.OPT_SORT_KEYS)
+
+
+# Single-flight: identical concurrent requests share one HTTP call
+_INFLIGHT: dict = {}
+
+
+async def _post_coalesced(url: str, payload_bytes: bytes) -> dict:
+    """
+    POST a pre-serialized body, coalescing identical in-flight requests.
+
+    When parallel tool calls carry the same payload (e.g. two agents asking
+    for the same search), only the first issues the HTTP request; the rest
+    await its Future and share the parsed response.
+    """
+    key = hashlib.blake2b(url.encode() + payload_bytes).hexdigest()
+
+    existing = _INFLIGHT.get(key)
+    if existing is not None:
+        return await existing
+
+    future = asyncio.get_running_loop().create_future()
+    _INFLIGHT[key] = future
+    try:
+        response = await _post_with_retry(
+            url, payload_bytes, {"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+    except BaseException as exc:
+        future.set_exception(exc)
+        future.exception()  # mark retrieved so lone failures don't warn
+        raise
+    else:
+        future.set_result(data)
+        return data
+    finally:
+        del _INFLIGHT[key]
+
+
+# Bound concurrent prefetches so cache warming never crowds out real calls
+# or pushes past Google's QPS quota
+_PREFETCH_SEM = asyncio.Semaphore(3)
+
+# The event loop only keeps weak references to tasks; hold strong ones here
+# until each prefetch finishes so it can't be garbage-collected mid-flight
+_PREFETCH_TASKS: set = set()
+
+
+async def _prefetch_details(url: str, place_id: str) -> None:
+    """
+    Warm the details cache for a search result in the background.
+
+    Users commonly follow a search with "tell me more about #2"; fetching
+    details for the top results ahead of time turns that next tool call
+    into a cache hit. Failures are ignored - this is purely opportunistic.
+    """
+    if place_id in _DETAILS_CACHE:
+        return
+    async with _PREFETCH_SEM:
+        if place_id in _DETAILS_CACHE:
+            return
+        try:
+            data = await _post_coalesced(url, _serialize_details(place_id))
+        except Exception:
+            return
+        if data.get("success") and data.get("formatted"):
+            _DETAILS_CACHE[place_id] = data["formatted"]
+
+
+def _status_payload(description: str, done: bool) -> dict:
+    return {"type": "status", "data": {"description": description, "done": done}}
+
+
+# Fixed status events built once at import; only the dynamic search-start
+# message is constructed per call, and only when a listener is attached
+_STATUS_SEARCH_DONE = _status_payload("Search completed", True)
+_STATUS_DIRECTIONS_START = _status_payload("Getting directions...", False)
+_STATUS_DIRECTIONS_DONE = _status_payload("Directions ready", True)
+_STATUS_DETAILS_START = _status_payload("Getting place details...", False)
+_STATUS_DETAILS_DONE = _status_payload("Details loaded", True)
+
+
+async def _emit(emitter: Optional[Callable[[dict], Any]], event: dict) -> None:
+    """Send an event, awaiting the emitter if it is a coroutine."""
+    if emitter is None:
+        return
+    result = emitter(event)
+    if inspect.isawaitable(result):
+        await result
+
 
 class Tools:
-    def __init__(self):
-        # Use Docker service name when running in containers, localhost for local dev
-        self.backend_url = "http://backend:8432/api/maps"
+    @property
+    def backend_url(self) -> str:
+        # Re-evaluated per call so the pinned IP refreshes across restarts
+        return _backend_base_url()
 
-    def search_places(
+    async def search_places(
         self,
         query: str,
         location: Optional[str] = None,
@@ -34,57 +298,71 @@ class Tools:
         """
         try:
             if __event_emitter__:
-                __event_emitter__({"type": "status", "data": {"description": f"Searching for {query}...", "done": False}})
+                await _emit(__event_emitter__, _status_payload(f"Searching for {query}...", False))
 
-            response = requests.post(
+            data = await _post_coalesced(
                 f"{self.backend_url}/search-places",
-                json={
-                    "query": query,
-                    "location": location,
-                    "radius": radius
-                },
-                timeout=10
+                _serialize_search(query, location, radius)
             )
-            response.raise_for_status()
-            data = response.json()
 
             if data.get("success"):
                 places = data.get("data", [])
 
+                # Warm the details cache for the likely follow-up lookups
+                for place in places[:5]:
+                    place_id = place.get("placeId")
+                    if place_id and place_id not in _DETAILS_CACHE:
+                        task = asyncio.create_task(
+                            _prefetch_details(f"{self.backend_url}/place-details", place_id)
+                        )
+                        _PREFETCH_TASKS.add(task)
+                        task.add_done_callback(_PREFETCH_TASKS.discard)
+
+                # Newer backends format the reply once server-side
+                formatted = data.get("formatted")
+                if formatted:
+                    await _emit(__event_emitter__, _STATUS_SEARCH_DONE)
+                    return formatted
+
                 if not places:
                     return f"No places found for '{query}'. Try a different search term or location."
 
-                # Format results for display
-                result = f"Found {len(places)} places for '{query}':\n\n"
+                # Format results through the precompiled template; one dict
+                # build and one format_map per place instead of many f-strings
+                parts = [f"Found {len(places)} places for '{query}':\n\n"]
 
                 for i, place in enumerate(places[:5], 1):
-                    result += f"{i}. **{place['name']}**\n"
-                    result += f"   📍 {place['address']}\n"
-
-                    if place.get('rating'):
-                        result += f"   ⭐ Rating: {place['rating']}"
-                        if place.get('userRatingsTotal'):
-                            result += f" ({place['userRatingsTotal']} reviews)"
-                        result += "\n"
-
-                    result += f"   🔗 [View on Google Maps]({place['googleMapsUrl']})\n"
-                    result += f"   🗺️ [Embedded Map]({place['embedMapUrl']})\n"
-                    result += f"   📌 Place ID: `{place['placeId']}`\n\n"
-
-                if __event_emitter__:
-                    __event_emitter__({"type": "status", "data": {"description": "Search completed", "done": True}})
-
-                return result
+                    rating = place.get('rating')
+                    if rating:
+                        ratings_total = place.get('userRatingsTotal')
+                        review_count = f" ({ratings_total} reviews)" if ratings_total else ""
+                        rating_line = f"   ⭐ Rating: {rating}{review_count}\n"
+                    else:
+                        rating_line = ""
+
+                    parts.append(_PLACE_TMPL.format_map({
+                        "i": i,
+                        "name": place['name'],
+                        "address": place['address'],
+                        "rating_line": rating_line,
+                        "googleMapsUrl": place['googleMapsUrl'],
+                        "embedMapUrl": place['embedMapUrl'],
+                        "placeId": place['placeId'],
+                    }))
+
+                await _emit(__event_emitter__, _STATUS_SEARCH_DONE)
+
+                return "".join(parts)
             else:
                 error_msg = data.get("error", {}).get("message", "Unknown error")
                 return f"Error searching places: {error_msg}"
 
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             return "❌ Cannot connect to backend API. Make sure the backend server is running at http://localhost:8432"
         except Exception as e:
             return f"❌ Error: {str(e)}"
 
-    def get_directions(
+    async def get_directions(
         self,
         origin: str,
         destination: str,
@@ -101,56 +379,58 @@ class Tools:
         :return: Formatted string with directions
         """
         try:
-            if __event_emitter__:
-                __event_emitter__({"type": "status", "data": {"description": "Getting directions...", "done": False}})
+            await _emit(__event_emitter__, _STATUS_DIRECTIONS_START)
 
-            response = requests.post(
+            response = await _post_with_retry(
                 f"{self.backend_url}/directions",
-                json={
-                    "origin": origin,
-                    "destination": destination,
-                    "mode": mode
-                },
-                timeout=10
+                _serialize_directions(origin, destination, mode),
+                {"Content-Type": "application/json"}
             )
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
 
             if data.get("success"):
+                # Newer backends format the reply once server-side
+                formatted = data.get("formatted")
+                if formatted:
+                    await _emit(__event_emitter__, _STATUS_DIRECTIONS_DONE)
+                    return formatted
+
                 directions = data["data"]
 
-                result = f"**Directions from {origin} to {destination}**\n\n"
-                result += f"🚗 Mode: {mode.capitalize()}\n"
-                result += f"📏 Distance: {directions['distance']['text']}\n"
-                result += f"⏱️ Duration: {directions['duration']['text']}\n"
-                result += f"📍 Start: {directions['startAddress']}\n"
-                result += f"🎯 End: {directions['endAddress']}\n\n"
+                parts = [
+                    f"**Directions from {origin} to {destination}**\n\n",
+                    f"🚗 Mode: {mode.capitalize()}\n",
+                    f"📏 Distance: {directions['distance']['text']}\n",
+                    f"⏱️ Duration: {directions['duration']['text']}\n",
+                    f"📍 Start: {directions['startAddress']}\n",
+                    f"🎯 End: {directions['endAddress']}\n\n",
+                ]
 
                 if directions.get('summary'):
-                    result += f"**Route:** {directions['summary']}\n\n"
+                    parts.append(f"**Route:** {directions['summary']}\n\n")
 
-                result += "**Turn-by-turn directions:**\n"
+                parts.append("**Turn-by-turn directions:**\n")
                 for i, step in enumerate(directions['steps'][:10], 1):
-                    result += f"{i}. {step['instruction']}\n"
-                    result += f"   ({step['distance']}, ~{step['duration']})\n\n"
+                    parts.append(f"{i}. {step['instruction']}\n")
+                    parts.append(f"   ({step['distance']}, ~{step['duration']})\n\n")
 
-                result += f"\n🔗 [View on Google Maps]({directions['googleMapsUrl']})\n"
-                result += f"🗺️ [Embedded Map]({directions['embedMapUrl']})\n"
+                parts.append(f"\n🔗 [View on Google Maps]({directions['googleMapsUrl']})\n")
+                parts.append(f"🗺️ [Embedded Map]({directions['embedMapUrl']})\n")
 
-                if __event_emitter__:
-                    __event_emitter__({"type": "status", "data": {"description": "Directions ready", "done": True}})
+                await _emit(__event_emitter__, _STATUS_DIRECTIONS_DONE)
 
-                return result
+                return "".join(parts)
             else:
                 error_msg = data.get("error", {}).get("message", "Unknown error")
                 return f"Error getting directions: {error_msg}"
 
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             return "❌ Cannot connect to backend API. Make sure the backend server is running at http://localhost:8432"
         except Exception as e:
             return f"❌ Error: {str(e)}"
 
-    def get_place_details(
+    async def get_place_details(
         self,
         placeId: str,
         __event_emitter__: Callable[[dict], Any] = None
@@ -162,67 +442,79 @@ class Tools:
         :param placeId: Google Maps Place ID (from search results)
         :return: Formatted string with place details
         """
+        cached = _DETAILS_CACHE.get(placeId)
+        if cached is not None:
+            await _emit(__event_emitter__, _STATUS_DETAILS_DONE)
+            return cached
+
         try:
-            if __event_emitter__:
-                __event_emitter__({"type": "status", "data": {"description": "Getting place details...", "done": False}})
+            await _emit(__event_emitter__, _STATUS_DETAILS_START)
 
-            response = requests.post(
+            data = await _post_coalesced(
                 f"{self.backend_url}/place-details",
-                json={"placeId": placeId},
-                timeout=10
+                _serialize_details(placeId)
             )
-            response.raise_for_status()
-            data = response.json()
 
             if data.get("success"):
+                # Newer backends format the reply once server-side
+                formatted = data.get("formatted")
+                if formatted:
+                    _DETAILS_CACHE[placeId] = formatted
+                    await _emit(__event_emitter__, _STATUS_DETAILS_DONE)
+                    return formatted
+
                 place = data["data"]
 
-                result = f"**{place['name']}**\n\n"
-                result += f"📍 **Address:** {place['address']}\n"
+                parts = [
+                    f"**{place['name']}**\n\n",
+                    f"📍 **Address:** {place['address']}\n",
+                ]
 
-                if place.get('rating'):
-                    result += f"⭐ **Rating:** {place['rating']}"
-                    if place.get('userRatingsTotal'):
-                        result += f" ({place['userRatingsTotal']} reviews)"
-                    result += "\n"
+                rating = place.get('rating')
+                if rating:
+                    ratings_total = place.get('userRatingsTotal')
+                    review_count = f" ({ratings_total} reviews)" if ratings_total else ""
+                    parts.append(f"⭐ **Rating:** {rating}{review_count}\n")
 
                 if place.get('phoneNumber'):
-                    result += f"📞 **Phone:** {place['phoneNumber']}\n"
+                    parts.append(f"📞 **Phone:** {place['phoneNumber']}\n")
 
                 if place.get('website'):
-                    result += f"🌐 **Website:** {place['website']}\n"
+                    parts.append(f"🌐 **Website:** {place['website']}\n")
 
                 # Opening hours
                 if place.get('openingHours'):
                     hours = place['openingHours']
                     status = "🟢 Open now" if hours.get('openNow') else "🔴 Closed"
-                    result += f"\n**Hours:** {status}\n"
+                    parts.append(f"\n**Hours:** {status}\n")
 
-                    if hours.get('hours'):
-                        result += "```\n"
-                        for day_hours in hours['hours']:
-                            result += f"{day_hours}\n"
-                        result += "```\n"
+                    if hours.get('weekdayText'):
+                        parts.append("```\n")
+                        for day_hours in hours['weekdayText']:
+                            parts.append(f"{day_hours}\n")
+                        parts.append("```\n")
 
                 # Reviews
                 if place.get('reviews'):
-                    result += "\n**Recent Reviews:**\n"
+                    parts.append("\n**Recent Reviews:**\n")
                     for i, review in enumerate(place['reviews'][:3], 1):
-                        result += f"\n{i}. **{review['author']}** - {'⭐' * review['rating']}\n"
-                        result += f"   \"{review['text']}\"\n"
+                        parts.append(f"\n{i}. **{review['authorName']}** - {'⭐' * review['rating']}\n")
+                        parts.append(f"   \"{review['text']}\"\n")
+
+                parts.append(f"\n🔗 [View on Google Maps]({place['googleMapsUrl']})\n")
+                parts.append(f"🗺️ [Embedded Map]({place['embedMapUrl']})\n")
 
-                result += f"\n🔗 [View on Google Maps]({place['googleMapsUrl']})\n"
-                result += f"🗺️ [Embedded Map]({place['embedMapUrl']})\n"
+                result = "".join(parts)
+                _DETAILS_CACHE[placeId] = result
 
-                if __event_emitter__:
-                    __event_emitter__({"type": "status", "data": {"description": "Details loaded", "done": True}})
+                await _emit(__event_emitter__, _STATUS_DETAILS_DONE)
 
                 return result
             else:
                 error_msg = data.get("error", {}).get("message", "Unknown error")
                 return f"Error getting place details: {error_msg}"
 
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             return "❌ Cannot connect to backend API. Make sure the backend server is running at http://localhost:8432"
         except Exception as e:
             return f"❌ Error: {str(e)}"
@@ -1,12 +1,69 @@
 """
 Google Maps Integration Functions for Open WebUI
 This file contains all the functions that the LLM can call to interact with Google Maps
+requirements: requests, orjson, cachetools, pydantic, urllib3>=2
 """
 
+import logging
+import math
+import re
 import requests
-import json
+import orjson
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field
+from cachetools import LRUCache, TTLCache
+from pydantic import BaseModel, Field, TypeAdapter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_LOGGER = logging.getLogger(__name__)
+
+# Shared session so urllib3 reuses keep-alive connections to the backend
+# instead of paying the TCP handshake on every tool call. Transient 429/5xx
+# responses retry with exponential backoff and jitter, honoring Retry-After,
+# so the LLM doesn't have to replay the whole tool call (backoff_jitter
+# needs urllib3 >= 2).
+_SESSION = requests.Session()
+_SESSION.mount(
+    "http://",
+    HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            backoff_jitter=0.5,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=["POST"],
+            respect_retry_after_header=True,
+        ),
+    ),
+)
+
+# Stay under Google's default 10 QPS even when the batch tools fan out
+_CONCURRENCY = threading.Semaphore(8)
+
+# Advertise every encoding urllib3 can actually decode here; the backend only
+# compresses bodies above its threshold, so small responses stay plain
+_ENCODINGS = ["gzip"]
+try:
+    import brotli  # noqa: F401
+
+    _ENCODINGS.insert(0, "br")
+except ImportError:
+    pass
+try:
+    import zstandard  # noqa: F401
+
+    _ENCODINGS.insert(0, "zstd")
+except ImportError:
+    pass
+_SESSION.headers["Accept-Encoding"] = ", ".join(_ENCODINGS)
 
 
 class SearchPlacesInput(BaseModel):
@@ -25,11 +82,259 @@ class GetPlaceDetailsInput(BaseModel):
     placeId: str = Field(..., description="Google Maps Place ID")
 
 
+class SearchPlacesBatchInput(BaseModel):
+    queries: List[str] = Field(..., description="Search queries to run in parallel")
+    location: Optional[str] = Field(None, description="Location to search near")
+    radius: Optional[int] = Field(5000, description="Search radius in meters")
+
+
+class GetDirectionsBatchInput(BaseModel):
+    origin: str = Field(..., description="Starting location")
+    destinations: List[str] = Field(..., description="Destination locations")
+    mode: Optional[str] = Field("driving", description="Travel mode")
+
+
+class GetPlaceDetailsBatchInput(BaseModel):
+    placeIds: List[str] = Field(..., description="Google Maps Place IDs")
+
+
+# TypeAdapters are compiled once by pydantic-core at import time; reusing them
+# per call avoids re-resolving model fields in long-lived worker processes
+_SEARCH_VALIDATOR = TypeAdapter(SearchPlacesInput)
+_DIRECTIONS_VALIDATOR = TypeAdapter(GetDirectionsInput)
+_DETAILS_VALIDATOR = TypeAdapter(GetPlaceDetailsInput)
+
+
 # Backend API configuration
 BACKEND_URL = "http://localhost:8432/api/maps"
 
+# Ollama is already part of the stack, so reuse it for embeddings
+OLLAMA_URL = "http://localhost:11434"
+EMBED_MODEL = "nomic-embed-text"  # pulled by init-ollama.sh / make pull-model
 
-def search_places(query: str, location: Optional[str] = None, radius: int = 5000) -> Dict[str, Any]:
+# Separate session without the retry adapter: urllib3 retries connection
+# errors regardless of allowed_methods, so embedding through _SESSION would
+# spend seconds in backoff whenever Ollama is down. A plain session fails
+# fast and lets the semantic cache actually degrade to a no-op.
+_OLLAMA_SESSION = requests.Session()
+
+SEARCH_CACHE_TTL = 3600  # 1 hour
+SIMILARITY_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX_ROWS = 256  # per namespace; keeps the lookup scan bounded
+
+
+@lru_cache(maxsize=4096)
+def _canon(s: str) -> str:
+    """
+    Normalize a string for cache keying (lowercase, trimmed, NFKC).
+
+    Only used internally so "Coffee  Shops " and "coffee shops" share a
+    cache entry; the original string is what goes to the backend.
+    """
+    return unicodedata.normalize("NFKC", s.strip().casefold())
+
+
+class _SemanticCache:
+    """
+    Embedding-similarity cache for backend responses.
+
+    LLMs repeatedly issue near-duplicate queries ("coffee near me",
+    "coffee shops nearby"); a cosine match above SIMILARITY_THRESHOLD
+    returns the previous response without hitting the backend (or Google).
+    Embeddings come from the local Ollama instance; if Ollama is
+    unavailable the cache silently degrades to a no-op.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT, key_text TEXT, embedding TEXT, "
+            "response_json TEXT, ts INTEGER)"
+        )
+        self._lock = threading.Lock()
+
+    def _embed(self, text: str) -> Optional[List[float]]:
+        try:
+            response = _OLLAMA_SESSION.post(
+                f"{OLLAMA_URL}/api/embeddings",
+                data=orjson.dumps({"model": EMBED_MODEL, "prompt": text}),
+                headers={"Content-Type": "application/json"},
+                timeout=5
+            )
+            response.raise_for_status()
+            return orjson.loads(response.content).get("embedding")
+        except Exception:
+            return None
+
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    def get(self, namespace: str, key_text: str,
+            ttl: int) -> tuple[Optional[Any], Optional[List[float]]]:
+        """
+        Look up a response; returns (response, embedding).
+
+        The embedding of key_text is returned even on a miss so the caller
+        can pass it back to put() without paying for a second Ollama call.
+        """
+        embedding = self._embed(key_text)
+        if not embedding:
+            return None, None
+
+        cutoff = int(time.time()) - ttl
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT embedding, response_json FROM cache WHERE namespace = ? AND ts >= ?",
+                (namespace, cutoff)
+            ).fetchall()
+
+        best_score, best_response = 0.0, None
+        for row_embedding, response_json in rows:
+            score = self._cosine(embedding, orjson.loads(row_embedding))
+            if score > best_score:
+                best_score, best_response = score, response_json
+
+        if best_score >= SIMILARITY_THRESHOLD and best_response is not None:
+            return orjson.loads(best_response), embedding
+        return None, embedding
+
+    def put(self, namespace: str, key_text: str, response: Any, ttl: int,
+            embedding: Optional[List[float]] = None) -> None:
+        if embedding is None:
+            embedding = self._embed(key_text)
+        if not embedding:
+            return
+
+        now = int(time.time())
+        with self._lock:
+            # Drop expired rows so the linear scan stays small
+            self._db.execute(
+                "DELETE FROM cache WHERE namespace = ? AND ts < ?",
+                (namespace, now - ttl)
+            )
+            self._db.execute(
+                "INSERT INTO cache (namespace, key_text, embedding, response_json, ts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, key_text, orjson.dumps(embedding).decode(),
+                 orjson.dumps(response).decode(), now)
+            )
+            # TTL pruning alone lets an hour of varied queries pile up rows;
+            # every lookup cosines over all of them, so also cap the row
+            # count, evicting oldest first
+            self._db.execute(
+                "DELETE FROM cache WHERE namespace = ? AND rowid NOT IN ("
+                "SELECT rowid FROM cache WHERE namespace = ? "
+                "ORDER BY ts DESC LIMIT ?)",
+                (namespace, namespace, SEMANTIC_CACHE_MAX_ROWS)
+            )
+            self._db.commit()
+
+
+_SEMANTIC_CACHE = _SemanticCache()
+
+# Exact-match cache for place details: a placeId's address/phone/website are
+# effectively static for hours, so repeated lookups skip the backend entirely.
+# cachetools caches are not thread-safe and the batch tools hit this from
+# worker threads, so every access goes through the lock
+_DETAILS_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+_DETAILS_LOCK = threading.Lock()
+
+
+def cache_clear() -> None:
+    """Drop all cached place details."""
+    with _DETAILS_LOCK:
+        _DETAILS_CACHE.clear()
+
+
+# ETag revalidation cache: (endpoint, canonical payload) -> (etag, body, expiry).
+# LRU-bounded - stale entries stay useful for revalidation, so they are evicted
+# by recency rather than by age, and the process never grows one entry per
+# unique payload it has ever seen. Locked for the same reason as
+# _DETAILS_CACHE: even LRUCache.get mutates recency order
+_ETAG_CACHE: LRUCache = LRUCache(maxsize=512)
+_ETAG_LOCK = threading.Lock()
+
+
+def _parse_max_age(cache_control: Optional[str]) -> int:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else 0
+
+
+# Payload builders memoized per unique input, so duplicate calls reuse the
+# serialized bytes (which also key the ETag cache) instead of re-encoding
+@lru_cache(maxsize=256)
+def _serialize_search(query: str, location: Optional[str], radius: int) -> bytes:
+    return orjson.dumps(
+        {"query": query, "location": location, "radius": radius, "limit": 5},
+        option=orjson.OPT_SORT_KEYS,
+    )
+
+
+@lru_cache(maxsize=256)
+def _serialize_directions(origin: str, destination: str, mode: str) -> bytes:
+    return orjson.dumps(
+        {"origin": origin, "destination": destination, "mode": mode, "maxSteps": 10},
+        option=orjson.OPT_SORT_KEYS,
+    )
+
+
+@lru_cache(maxsize=1024)
+def _serialize_details(place_id: str) -> bytes:
+    return orjson.dumps({"placeId": place_id}, option=orjson.OPT_SORT_KEYS)
+
+
+def _conditional_post(endpoint: str, payload_bytes: bytes,
+                      no_cache: bool = False) -> Dict[str, Any]:
+    """
+    POST a pre-serialized body to the backend with ETag revalidation.
+
+    While the cached body is fresh (per the backend's Cache-Control max-age)
+    it is returned without any network traffic. Once stale, the request
+    carries If-None-Match; a 304 reuses the cached body so only headers
+    cross the wire. no_cache skips the fresh-window shortcut and always
+    revalidates - a 304 proves the cached body matches what the backend
+    would send, so the caller still never sees stale data.
+    """
+    key = (endpoint, payload_bytes)
+    with _ETAG_LOCK:
+        cached = _ETAG_CACHE.get(key)
+
+    headers = {"Content-Type": "application/json"}
+    if cached:
+        etag, body, expiry = cached
+        if not no_cache and time.time() < expiry:
+            return body
+        headers["If-None-Match"] = etag
+
+    with _CONCURRENCY:
+        response = _SESSION.post(
+            f"{BACKEND_URL}/{endpoint}",
+            data=payload_bytes,
+            headers=headers,
+            timeout=10
+        )
+
+    if response.status_code == 304 and cached:
+        return cached[1]
+
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+
+    etag = response.headers.get("ETag")
+    if etag:
+        max_age = _parse_max_age(response.headers.get("Cache-Control"))
+        with _ETAG_LOCK:
+            _ETAG_CACHE[key] = (etag, data, time.time() + max_age)
+
+    return data
+
+
+def search_places(query: str, location: Optional[str] = None, radius: int = 5000,
+                  no_cache: bool = False) -> Dict[str, Any]:
     """
     Search for places based on a text query.
 
@@ -37,22 +342,29 @@ def search_places(query: str, location: Optional[str] = None, radius: int = 5000
         query: Search query (e.g., "coffee shops", "restaurants near me")
         location: Optional location to search near
         radius: Search radius in meters (default: 5000)
+        no_cache: Skip the semantic cache (e.g., for sensitive prompts)
 
     Returns:
         Dictionary containing search results with place information
     """
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/search-places",
-            json={
-                "query": query,
-                "location": location,
-                "radius": radius
-            },
-            timeout=10
+        params = _SEARCH_VALIDATOR.validate_python(
+            {"query": query, "location": location, "radius": radius}
         )
-        response.raise_for_status()
-        data = response.json()
+    except Exception as e:
+        return {"error": f"Invalid input: {str(e)}"}
+    query, location, radius = params.query, params.location, params.radius
+
+    cache_key = f"{_canon(query)}|{_canon(location or '')}|{radius}"
+    cache_embedding = None
+    if not no_cache:
+        cached, cache_embedding = _SEMANTIC_CACHE.get("search", cache_key, SEARCH_CACHE_TTL)
+        if cached is not None:
+            return cached
+
+    try:
+        data = _conditional_post("search-places", _serialize_search(query, location, radius),
+                                 no_cache=no_cache)
 
         if data.get("success"):
             places = data.get("data", [])
@@ -75,11 +387,16 @@ def search_places(query: str, location: Optional[str] = None, radius: int = 5000
                     "placeId": place["placeId"]
                 })
 
+            if not no_cache:
+                _SEMANTIC_CACHE.put("search", cache_key, result, SEARCH_CACHE_TTL,
+                                    embedding=cache_embedding)
+
             return result
         else:
             return {"error": data.get("error", {}).get("message", "Unknown error")}
 
     except Exception as e:
+        _LOGGER.warning("search_places failed after retries: %s", e)
         return {"error": f"Failed to search places: {str(e)}"}
 
 
@@ -96,17 +413,15 @@ def get_directions(origin: str, destination: str, mode: str = "driving") -> Dict
         Dictionary containing route information and directions
     """
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/directions",
-            json={
-                "origin": origin,
-                "destination": destination,
-                "mode": mode
-            },
-            timeout=10
+        params = _DIRECTIONS_VALIDATOR.validate_python(
+            {"origin": origin, "destination": destination, "mode": mode}
         )
-        response.raise_for_status()
-        data = response.json()
+    except Exception as e:
+        return {"error": f"Invalid input: {str(e)}"}
+    origin, destination, mode = params.origin, params.destination, params.mode
+
+    try:
+        data = _conditional_post("directions", _serialize_directions(origin, destination, mode))
 
         if data.get("success"):
             directions = data["data"]
@@ -131,27 +446,38 @@ def get_directions(origin: str, destination: str, mode: str = "driving") -> Dict
             return {"error": data.get("error", {}).get("message", "Unknown error")}
 
     except Exception as e:
+        _LOGGER.warning("get_directions failed after retries: %s", e)
         return {"error": f"Failed to get directions: {str(e)}"}
 
 
-def get_place_details(placeId: str) -> Dict[str, Any]:
+def get_place_details(placeId: str, no_cache: bool = False) -> Dict[str, Any]:
     """
     Get detailed information about a specific place.
 
     Args:
         placeId: Google Maps Place ID
+        no_cache: Skip the details cache
 
     Returns:
         Dictionary containing detailed place information
     """
     try:
-        response = requests.post(
-            f"{BACKEND_URL}/place-details",
-            json={"placeId": placeId},
-            timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
+        params = _DETAILS_VALIDATOR.validate_python({"placeId": placeId})
+    except Exception as e:
+        return {"error": f"Invalid input: {str(e)}"}
+    placeId = params.placeId
+
+    # Place IDs are opaque tokens, so only the exact-match cache applies here;
+    # embedding similarity between two IDs says nothing about the places
+    if not no_cache:
+        with _DETAILS_LOCK:
+            cached = _DETAILS_CACHE.get(placeId)
+        if cached is not None:
+            return cached
+
+    try:
+        data = _conditional_post("place-details", _serialize_details(placeId),
+                                 no_cache=no_cache)
 
         if data.get("success"):
             place = data["data"]
@@ -182,14 +508,82 @@ def get_place_details(placeId: str) -> Dict[str, Any]:
                     for review in place["reviews"][:3]  # Top 3 reviews
                 ]
 
+            if not no_cache:
+                with _DETAILS_LOCK:
+                    _DETAILS_CACHE[placeId] = result
+
             return result
         else:
             return {"error": data.get("error", {}).get("message", "Unknown error")}
 
     except Exception as e:
+        _LOGGER.warning("get_place_details failed after retries: %s", e)
         return {"error": f"Failed to get place details: {str(e)}"}
 
 
+# Shared pool for the batch tools; sized to stay under Google's default QPS
+_BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+
+def search_places_batch(queries: List[str], location: Optional[str] = None,
+                        radius: int = 5000) -> Dict[str, Any]:
+    """
+    Search for several place queries in parallel.
+
+    Prefer this over repeated search_places calls when the user asks about
+    multiple things at once ("find a cafe, a pharmacy and an ATM near X") -
+    the queries fan out concurrently so latency is the slowest call, not
+    the sum of all of them.
+
+    Args:
+        queries: Search queries to run in parallel
+        location: Optional location to search near (applies to all queries)
+        radius: Search radius in meters (default: 5000)
+
+    Returns:
+        Dictionary mapping each query to its search result
+    """
+    results = _BATCH_EXECUTOR.map(lambda q: search_places(q, location, radius), queries)
+    return {"results": dict(zip(queries, results))}
+
+
+def get_directions_batch(origin: str, destinations: List[str],
+                         mode: str = "driving") -> Dict[str, Any]:
+    """
+    Get directions from one origin to several destinations in parallel.
+
+    Prefer this over repeated get_directions calls when the user asks for
+    routes to multiple places ("directions from A to B, C, and D").
+
+    Args:
+        origin: Starting location
+        destinations: Destination locations
+        mode: Travel mode (driving, walking, bicycling, transit)
+
+    Returns:
+        Dictionary mapping each destination to its route information
+    """
+    results = _BATCH_EXECUTOR.map(lambda d: get_directions(origin, d, mode), destinations)
+    return {"results": dict(zip(destinations, results))}
+
+
+def get_place_details_batch(placeIds: List[str]) -> Dict[str, Any]:
+    """
+    Get details for several places in parallel.
+
+    Prefer this over repeated get_place_details calls when the user asks
+    about multiple places ("details on these 5 places").
+
+    Args:
+        placeIds: Google Maps Place IDs
+
+    Returns:
+        Dictionary mapping each place ID to its detailed information
+    """
+    results = _BATCH_EXECUTOR.map(get_place_details, placeIds)
+    return {"results": dict(zip(placeIds, results))}
+
+
 # Function registry for Open WebUI
 TOOLS = [
     {
@@ -209,5 +603,23 @@ TOOLS = [
         "description": "Get detailed information about a specific place",
         "function": get_place_details,
         "parameters": GetPlaceDetailsInput
+    },
+    {
+        "name": "search_places_batch",
+        "description": "Search multiple place queries at once; use instead of repeated search_places calls",
+        "function": search_places_batch,
+        "parameters": SearchPlacesBatchInput
+    },
+    {
+        "name": "get_directions_batch",
+        "description": "Get directions to multiple destinations at once; use instead of repeated get_directions calls",
+        "function": get_directions_batch,
+        "parameters": GetDirectionsBatchInput
+    },
+    {
+        "name": "get_place_details_batch",
+        "description": "Get details for multiple places at once; use instead of repeated get_place_details calls",
+        "function": get_place_details_batch,
+        "parameters": GetPlaceDetailsBatchInput
     }
 ]
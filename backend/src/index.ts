@@ -1,6 +1,8 @@
 import { serve } from '@hono/node-server';
 import { Hono } from 'hono';
+import { compress } from 'hono/compress';
 import { cors } from 'hono/cors';
+import { etag } from 'hono/etag';
 import { logger } from 'hono/logger';
 import { prettyJSON } from 'hono/pretty-json';
 import { env } from './config/env.js';
@@ -18,6 +20,9 @@ const app = new Hono();
  * Global middleware
  */
 app.use('*', logger()); // Request logging
+// Compress large bodies (reviews, direction steps); the 8 KiB threshold keeps
+// small loopback responses from paying the compression CPU cost
+app.use('*', compress({ threshold: 8192 }));
 app.use('*', prettyJSON()); // Pretty JSON responses
 app.use(
   '*',
@@ -32,6 +37,12 @@ app.use(
  */
 app.use('/api/*', rateLimiter);
 
+/**
+ * Emit ETags and honor If-None-Match so clients can revalidate
+ * repeated queries with a 304 instead of re-downloading the body
+ */
+app.use('/api/maps/*', etag());
+
 /**
  * Apply authentication to protected routes
  * Skip for health check endpoints
@@ -1,5 +1,6 @@
 import { Hono } from 'hono';
 import { googleMapsService } from '../services/googleMaps.js';
+import { formatPlaceResults, formatPlaceDetails, formatDirections } from '../services/formatter.js';
 import {
   SearchPlacesSchema,
   GetPlaceDetailsSchema,
@@ -21,11 +22,16 @@ maps.post('/search-places', async (c) => {
 
     const results = await googleMapsService.searchPlaces(validated);
 
+    // Cap server-side so clients that only show the top N don't pay for the tail
+    const limited = validated.limit ? results.slice(0, validated.limit) : results;
+
     const response: ApiResponse<PlaceResult[]> = {
       success: true,
-      data: results,
+      data: limited,
+      formatted: formatPlaceResults(validated.query, limited),
     };
 
+    c.header('Cache-Control', 'private, max-age=300');
     return c.json(response);
   } catch (error) {
     throw error;
@@ -48,6 +54,7 @@ maps.post('/nearby-places', async (c) => {
       data: results,
     };
 
+    c.header('Cache-Control', 'private, max-age=300');
     return c.json(response);
   } catch (error) {
     throw error;
@@ -68,8 +75,10 @@ maps.post('/place-details', async (c) => {
     const response: ApiResponse<PlaceDetails> = {
       success: true,
       data: result,
+      formatted: formatPlaceDetails(result),
     };
 
+    c.header('Cache-Control', 'private, max-age=3600');
     return c.json(response);
   } catch (error) {
     throw error;
@@ -87,11 +96,23 @@ maps.post('/directions', async (c) => {
 
     const result = await googleMapsService.getDirections(validated);
 
+    // Cap server-side so clients that only show the first N steps don't pay for the tail
+    if (validated.maxSteps) {
+      result.steps = result.steps.slice(0, validated.maxSteps);
+    }
+
     const response: ApiResponse<DirectionsResult> = {
       success: true,
       data: result,
+      formatted: formatDirections(
+        validated.origin,
+        validated.destination,
+        validated.mode,
+        result
+      ),
     };
 
+    c.header('Cache-Control', 'private, max-age=600');
     return c.json(response);
   } catch (error) {
     throw error;
@@ -0,0 +1,112 @@
+import type { PlaceResult, PlaceDetails, DirectionsResult } from '../types/maps.js';
+
+/**
+ * Markdown Formatter
+ * Renders API results into the chat-ready Markdown previously built by the
+ * Open WebUI tool on every call. Formatting once server-side keeps the
+ * Python tool on a fast path and makes the formatted reply cacheable.
+ */
+
+/**
+ * Format place search results as a Markdown list
+ */
+export function formatPlaceResults(query: string, places: PlaceResult[]): string {
+  if (places.length === 0) {
+    return `No places found for '${query}'. Try a different search term or location.`;
+  }
+
+  const parts = [`Found ${places.length} places for '${query}':\n\n`];
+
+  places.slice(0, 5).forEach((place, index) => {
+    parts.push(`${index + 1}. **${place.name}**\n   📍 ${place.address}\n`);
+
+    if (place.rating) {
+      const reviewCount = place.userRatingsTotal ? ` (${place.userRatingsTotal} reviews)` : '';
+      parts.push(`   ⭐ Rating: ${place.rating}${reviewCount}\n`);
+    }
+
+    parts.push(`   🔗 [View on Google Maps](${place.googleMapsUrl})\n`);
+    parts.push(`   🗺️ [Embedded Map](${place.embedMapUrl})\n`);
+    parts.push(`   📌 Place ID: \`${place.placeId}\`\n\n`);
+  });
+
+  return parts.join('');
+}
+
+/**
+ * Format directions as Markdown with turn-by-turn steps
+ */
+export function formatDirections(
+  origin: string,
+  destination: string,
+  mode: string,
+  directions: DirectionsResult
+): string {
+  const parts = [
+    `**Directions from ${origin} to ${destination}**\n\n`,
+    `🚗 Mode: ${mode.charAt(0).toUpperCase()}${mode.slice(1)}\n`,
+    `📏 Distance: ${directions.distance.text}\n`,
+    `⏱️ Duration: ${directions.duration.text}\n`,
+    `📍 Start: ${directions.startAddress}\n`,
+    `🎯 End: ${directions.endAddress}\n\n`,
+  ];
+
+  if (directions.summary) {
+    parts.push(`**Route:** ${directions.summary}\n\n`);
+  }
+
+  parts.push('**Turn-by-turn directions:**\n');
+  directions.steps.slice(0, 10).forEach((step, index) => {
+    parts.push(`${index + 1}. ${step.instruction}\n`);
+    parts.push(`   (${step.distance}, ~${step.duration})\n\n`);
+  });
+
+  parts.push(`\n🔗 [View on Google Maps](${directions.googleMapsUrl})\n`);
+  parts.push(`🗺️ [Embedded Map](${directions.embedMapUrl})\n`);
+
+  return parts.join('');
+}
+
+/**
+ * Format place details as Markdown with hours and reviews
+ */
+export function formatPlaceDetails(place: PlaceDetails): string {
+  const parts = [`**${place.name}**\n\n`, `📍 **Address:** ${place.address}\n`];
+
+  if (place.rating) {
+    const reviewCount = place.userRatingsTotal ? ` (${place.userRatingsTotal} reviews)` : '';
+    parts.push(`⭐ **Rating:** ${place.rating}${reviewCount}\n`);
+  }
+
+  if (place.phoneNumber) {
+    parts.push(`📞 **Phone:** ${place.phoneNumber}\n`);
+  }
+
+  if (place.website) {
+    parts.push(`🌐 **Website:** ${place.website}\n`);
+  }
+
+  if (place.openingHours) {
+    const status = place.openingHours.openNow ? '🟢 Open now' : '🔴 Closed';
+    parts.push(`\n**Hours:** ${status}\n`);
+
+    if (place.openingHours.weekdayText?.length) {
+      parts.push('```\n');
+      place.openingHours.weekdayText.forEach((dayHours) => parts.push(`${dayHours}\n`));
+      parts.push('```\n');
+    }
+  }
+
+  if (place.reviews?.length) {
+    parts.push('\n**Recent Reviews:**\n');
+    place.reviews.slice(0, 3).forEach((review, index) => {
+      parts.push(`\n${index + 1}. **${review.authorName}** - ${'⭐'.repeat(review.rating)}\n`);
+      parts.push(`   "${review.text}"\n`);
+    });
+  }
+
+  parts.push(`\n🔗 [View on Google Maps](${place.googleMapsUrl})\n`);
+  parts.push(`🗺️ [Embedded Map](${place.embedMapUrl})\n`);
+
+  return parts.join('');
+}
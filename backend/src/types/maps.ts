@@ -6,6 +6,7 @@ export const SearchPlacesSchema = z.object({
   location: z.string().optional(),
   radius: z.number().min(1).max(50000).optional().default(5000),
   type: z.string().optional(),
+  limit: z.number().min(1).max(20).optional(),
 });
 
 export const GetPlaceDetailsSchema = z.object({
@@ -16,6 +17,7 @@ export const GetDirectionsSchema = z.object({
   origin: z.string().min(1, 'Origin is required'),
   destination: z.string().min(1, 'Destination is required'),
   mode: z.enum(['driving', 'walking', 'bicycling', 'transit']).optional().default('driving'),
+  maxSteps: z.number().min(1).max(100).optional(),
 });
 
 export const GetNearbyPlacesSchema = z.object({
@@ -97,5 +99,6 @@ export interface ErrorResponse {
 export interface ApiResponse<T> {
   success: boolean;
   data?: T;
+  formatted?: string;
   error?: ErrorResponse;
 }
@@ -22,4 +22,13 @@ else
   echo "✅ llama3.2 model installed successfully!"
 fi
 
+# Check if nomic-embed-text is already installed (used by the tool's semantic cache)
+if docker exec ollama ollama list | grep -q "nomic-embed-text"; then
+  echo "✅ nomic-embed-text is already installed"
+else
+  echo "📥 Pulling nomic-embed-text model (used for semantic caching)..."
+  docker exec ollama ollama pull nomic-embed-text
+  echo "✅ nomic-embed-text model installed successfully!"
+fi
+
 echo "🎉 Setup complete! You can now use Open WebUI at http://localhost:3210"